@@ -1,30 +1,123 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
 import os
+import hashlib
+import hmac
 import unicodedata
 import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from operator import itemgetter
 from io import BytesIO
+from openpyxl import load_workbook
+
+try:
+    from numba import config as numba_config, njit, prange
+    # O Streamlit roda o script numa thread de trabalho: com TBB iniciado fora da thread principal o
+    # processo trava ao encerrar, então OpenMP tem prioridade quando disponível
+    numba_config.THREADING_LAYER_PRIORITY = ['omp', 'tbb', 'workqueue']
+    # Kernels compilados ficam em disco entre processos: sem esse cache, o primeiro painel compila por ~17 s.
+    # Padrão em data/.numba_cache, ao lado do cache Parquet; NUMBA_CACHE_DIR aponta para outro diretório
+    # persistente e gravável (ex.: um volume do container). Diretório sem escrita: o Numba usa o próximo local
+    numba_config.CACHE_DIR = numba_config.CACHE_DIR or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', '.numba_cache'
+    )
+    HAS_NUMBA = True
+except ImportError:  # Numba é opcional: sem ele os kernels rodam como Python puro
+    HAS_NUMBA = False
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+    prange = range
 
 # CSS para ocultar o footer do Streamlit
-hide_streamlit_style = """
+HIDE_FOOTER_CSS = """
 <style>
 footer {visibility: hidden;}
 </style>
 """
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+
+# CSS para estilizar o formulário de login
+LOGIN_CSS = """
+<style>
+.login-container {
+    max-width: 400px;
+    margin: 0 auto;
+    padding: 2rem;
+    border-radius: 10px;
+    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    background-color: #f8f9fa;
+}
+.login-title {
+    text-align: center;
+    color: #2c3e50;
+    margin-bottom: 2rem;
+}
+.stButton > button {
+    width: 100%;
+    background-color: #3498db;
+    color: white;
+    border: none;
+    padding: 0.5rem 1rem;
+    border-radius: 5px;
+    font-weight: bold;
+}
+.stButton > button:hover {
+    background-color: #2980b9;
+}
+</style>
+"""
 
 # === Configurações ===
 FORECAST_MONTHS = 6
 REDUCTION_FACTOR = 0.9
 MIN_DATE = '2024-01-01'
+MIN_TS = np.datetime64(MIN_DATE, 'ns')
+DATE_FORMAT = '%d/%m/%Y'  # formato das datas de emissão quando a planilha as traz como texto
+REQUIRED_COLUMNS = ['Emissao', 'Cliente', 'Produto', 'Quantidade']
+OPTIONAL_COLUMNS = ['Grupo']
+# Versão do formato do cache Parquet: incrementar sempre que a limpeza/tipagem em read_sales_excel mudar
+PARQUET_CACHE_VERSION = 2
+PREVISAO_DTYPE = pd.CategoricalDtype(['HISTÓRICO', 'PREVISÃO'])  # tipo da linha no gráfico: códigos 0 e 1
+MAX_HISTORY_MONTHS = 36  # janela máxima de histórico usada no ajuste de cada série
+MIN_ACTIVE_MONTHS = 3  # séries com menos meses com venda têm previsão zero
+RECENT_MONTHS = 3  # idem para séries sem venda nos últimos RECENT_MONTHS meses-calendário antes da previsão
+STABLE_CV = 0.05  # séries com coeficiente de variação abaixo disso são previstas pela média
+FLAT_MAX_MONTHS = 4  # séries com até esse número de meses repetem o último valor
+SES_MAX_MONTHS = 9  # até esse número de meses: suavização exponencial simples com SES_ALPHA, sem ajuste
+SES_ALPHA = 0.3
+# Parâmetros fixos (alpha, beta, phi) do Holt amortecido, ex.: (0.5, 0.1, 0.9).
+# None = estimar por série (Nelder-Mead); definidos = todas as séries previstas de uma vez (vetorizado)
+HOLT_FIXED_PARAMS = None
+# Limites do ajuste para (alpha, beta/alpha, phi), como no statsmodels; nível e tendência iniciais são livres
+HOLT_LOWER = np.array([0.0, 0.0, 0.8])
+HOLT_UPPER = np.array([1.0, 1.0, 0.995])
+HOLT_MAX_ITER = 2000  # iterações máximas de cada rodada do Nelder-Mead
+FORECAST_CACHE_MAX = 50_000  # séries memorizadas no cache de previsões do processo (as menos usadas saem primeiro)
 logging.getLogger('streamlit.runtime.scriptrunner').setLevel(logging.ERROR)
 
 # === Credenciais de Autenticação ===
 USUARIOS = {
     "comercial": "cad@2025"
 }
+# Hash SHA-256 das senhas calculado uma vez: o login compara sempre 32 bytes em tempo constante
+_USUARIOS_HASH = {u: hashlib.sha256(p.encode()).digest() for u, p in USUARIOS.items()}
+
+class _CombiningTable(dict):
+    """Tabela de str.translate que remove marcas combinantes (categoria Mn) de qualquer bloco Unicode.
+
+    Cada codepoint é classificado na primeira vez que aparece e fica memorizado na própria tabela.
+    """
+    def __missing__(self, codepoint):
+        destino = None if unicodedata.category(chr(codepoint)) == 'Mn' else codepoint
+        self[codepoint] = destino
+        return destino
+
+_COMBINING = _CombiningTable()
 
 def check_authentication():
     """Verifica se o usuário está autenticado"""
@@ -38,38 +131,7 @@ def check_authentication():
 
 def show_login_page():
     """Exibe a página de login"""
-    st.set_page_config(page_title="LOGIN - PAINEL DE VENDAS", layout="centered")
-    
-    # CSS para estilizar o formulário de login
-    st.markdown("""
-    <style>
-    .login-container {
-        max-width: 400px;
-        margin: 0 auto;
-        padding: 2rem;
-        border-radius: 10px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        background-color: #f8f9fa;
-    }
-    .login-title {
-        text-align: center;
-        color: #2c3e50;
-        margin-bottom: 2rem;
-    }
-    .stButton > button {
-        width: 100%;
-        background-color: #3498db;
-        color: white;
-        border: none;
-        padding: 0.5rem 1rem;
-        border-radius: 5px;
-        font-weight: bold;
-    }
-    .stButton > button:hover {
-        background-color: #2980b9;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(LOGIN_CSS, unsafe_allow_html=True)
     
     st.markdown('<div class="login-container">', unsafe_allow_html=True)
     st.markdown('<h1 class="login-title">🔐 ACESSO AO SISTEMA</h1>', unsafe_allow_html=True)
@@ -102,7 +164,9 @@ def show_login_page():
 
 def authenticate_user(usuario, senha):
     """Autentica o usuário"""
-    return usuario in USUARIOS and USUARIOS[usuario] == senha
+    # Usuário inexistente compara contra um hash nulo: mesmo caminho e mesmo custo de um usuário válido
+    informado = hashlib.sha256(senha.encode()).digest()
+    return hmac.compare_digest(_USUARIOS_HASH.get(usuario, b'\x00' * 32), informado)
 
 def logout():
     """Realiza o logout do usuário"""
@@ -112,17 +176,35 @@ def logout():
     st.session_state.authenticated = False
     st.rerun()
 
+@lru_cache(maxsize=4096)
 def remove_acentos(text):
     if not isinstance(text, str):
         return text
-    return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn').strip().lower()
+    return unicodedata.normalize('NFD', text).translate(_COMBINING).strip().lower()
+
+def remove_acentos_series(serie):
+    """Versão vetorizada de remove_acentos para colunas inteiras (valores não-texto viram NaN)"""
+    return serie.str.normalize('NFD').str.translate(_COMBINING).str.strip().str.lower()
 
-def find_column(df, target):
-    target_norm = remove_acentos(target)
-    for col in df.columns:
-        if remove_acentos(col) == target_norm:
-            return col
-    return None
+# Nome normalizado -> nome canônico das colunas lidas da planilha; as demais nem são extraídas
+WANTED = {remove_acentos(c): c for c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+
+def cell_text(valor):
+    """Texto de uma célula do Excel como o pandas leria com dtype=str (vazio vira NaN, 123.0 vira '123')"""
+    if valor is None or valor == '' or (not isinstance(valor, str) and pd.isna(valor)):
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+def normalize_text(serie):
+    """Aplica strip + upper apenas sobre os valores distintos e reconstrói a coluna pelos códigos.
+
+    Células vazias continuam NaN (sem virar o texto 'NAN'), para o filtro de nulos descartar a linha.
+    """
+    codes, uniques = pd.factorize(serie, use_na_sentinel=False)
+    normalizados = pd.Series([cell_text(u) for u in uniques], dtype=object).str.strip().str.upper().to_numpy()
+    return pd.Series(normalizados[codes], index=serie.index)
 
 def validate_data(df, required_cols):
     missing = [c for c in required_cols if c not in df.columns]
@@ -141,48 +223,385 @@ def load_data():
         st.error(f"❌ Arquivo não encontrado: {path}")
         st.stop()
 
-    df = pd.read_excel(path, sheet_name='Base vendas', dtype=str)
-    df.columns = df.columns.str.strip()
-    cols = {}
-    for c in ['Emissao', 'Cliente', 'Produto', 'Quantidade']:
-        fc = find_column(df, c)
-        if not fc:
-            st.error(f"❌ Coluna obrigatória '{c}' não encontrada.")
-            st.stop()
-        cols[c] = fc
-
-    df[cols['Cliente']] = df[cols['Cliente']].astype(str).str.strip().str.upper()
-    df[cols['Produto']] = df[cols['Produto']].astype(str).str.strip().str.upper()
-    df[cols['Emissao']] = pd.to_datetime(df[cols['Emissao']], errors='coerce')
-    df[cols['Quantidade']] = pd.to_numeric(df[cols['Quantidade']], errors='coerce')
-
-    df = df.dropna(subset=[cols['Emissao'], cols['Cliente'], cols['Produto'], cols['Quantidade']])
-    df = df[df[cols['Emissao']] >= pd.to_datetime(MIN_DATE)]
+    # Cache em Parquet ao lado da planilha, já limpo e tipado: o Excel só é relido quando for mais novo.
+    # A versão no nome do arquivo descarta caches gravados por uma limpeza anterior
+    parquet_path = f'{path}.v{PARQUET_CACHE_VERSION}.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(path):
+        try:
+            return pd.read_parquet(parquet_path)
+        except Exception as e:
+            logging.getLogger(__name__).warning("Cache Parquet ilegível, relendo o Excel: %s", e)
+
+    df = read_sales_excel(path)
+    try:
+        df.to_parquet(parquet_path, engine='pyarrow', compression='zstd')
+    except Exception as e:
+        logging.getLogger(__name__).warning("Não foi possível gravar o cache Parquet: %s", e)
+    return df
+
+@st.cache_resource(ttl=3600)
+def get_data():
+    """Base de vendas e sua agregação mensal, compartilhadas por todas as sessões (somente leitura)"""
+    # cache_resource devolve o mesmo objeto, sem copiar/desserializar a base a cada rerun como o cache_data
+    df = load_data()
+    # Soma por grupo/cliente/produto/mês: tudo o que o painel filtra e agrega é aditivo nessas chaves,
+    # então os reruns trabalham sobre ~1/3 das linhas. Reordenada por mês como a base
+    df_monthly = (
+        df.groupby(['Grupo', 'Cliente', 'Produto', 'AnoMes'], observed=True)['Quantidade'].sum()
+        .reset_index()
+        .sort_values('AnoMes', kind='mergesort', ignore_index=True)
+    )
+    return df, df_monthly
+
+def read_sales_excel(path):
+    """Lê a aba 'Base vendas' da planilha e devolve os dados limpos e tipados"""
+    # Leitura em streaming (read_only): as linhas vêm como tuplas de valores, sem objetos de célula
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb['Base vendas']
+        # Sem confiar no registro <dimension> da planilha (ausente ou errado, corta as linhas), como o pandas
+        ws.reset_dimensions()
+        linhas = ws.iter_rows(values_only=True)
+        header = next(linhas)
+        # Normaliza os cabeçalhos uma única vez e fica só com as colunas de WANTED (como um usecols)
+        normalizados = remove_acentos_series(pd.Series(header, dtype=object))
+        cols = {WANTED[n]: fc for n, fc in zip(normalizados, header) if n in WANTED}
+        for c in REQUIRED_COLUMNS:
+            if c not in cols:
+                st.error(f"❌ Coluna obrigatória '{c}' não encontrada.")
+                st.stop()
+
+        # Só as colunas usadas são extraídas de cada linha; o DataFrame é montado uma única vez.
+        # Linhas mais curtas que o cabeçalho (células vazias no fim) são completadas com None
+        pegar = itemgetter(*[header.index(fc) for fc in cols.values()])
+        largura = len(header)
+        df = pd.DataFrame(
+            [pegar(linha if len(linha) >= largura else linha + (None,) * (largura - len(linha))) for linha in linhas],
+            columns=list(cols)
+        )
+    finally:
+        wb.close()
+
+    df['Cliente'] = normalize_text(df['Cliente'])
+    df['Produto'] = normalize_text(df['Produto'])
+    # Datas nativas do Excel já chegam como datetime64; texto é convertido com formato fixo (sem inferência)
+    if not pd.api.types.is_datetime64_dtype(df['Emissao']):
+        df['Emissao'] = pd.to_datetime(df['Emissao'], format=DATE_FORMAT, errors='coerce', cache=True)
+    # Idem para Quantidade: números do Excel já vêm tipados; só texto passa pela conversão
+    if not pd.api.types.is_numeric_dtype(df['Quantidade']):
+        df['Quantidade'] = pd.to_numeric(df['Quantidade'], errors='coerce')
+
+    # Nulos e datas anteriores a MIN_DATE saem num único filtro (NaT nunca passa na comparação)
+    mask = (df['Emissao'].to_numpy() >= MIN_TS) & df[['Cliente', 'Produto', 'Quantidade']].notna().all(axis=1).to_numpy()
+    df = df.loc[mask]
     if df.empty:
         st.error("❌ Nenhum dado após filtragem por data.")
         st.stop()
 
-    df['AnoMes'] = df[cols['Emissao']].dt.to_period('M').dt.to_timestamp()
+    # Trunca para o primeiro dia do mês com um cast numpy (sem passar por PeriodArray)
+    df['AnoMes'] = df['Emissao'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
 
-    grupo_col = find_column(df, 'Grupo')
-    if grupo_col:
-        df['Grupo'] = df[grupo_col].astype(str).str.strip().str.upper()
+    if 'Grupo' in cols:
+        # Grupo vazio entra como SEM GRUPO: NaN sairia dos groupby e quebraria a ordenação dos filtros
+        df['Grupo'] = normalize_text(df['Grupo']).fillna('SEM GRUPO')
     else:
         df['Grupo'] = 'SEM GRUPO'
 
-    return df[['Cliente', 'Produto', 'Quantidade', 'AnoMes', 'Grupo']]
+    # Categorias: filtros e groupbys passam a comparar códigos inteiros em vez de strings.
+    # Quantidade tem frações, então float32 (não int32): metade dos bytes nos groupby/pivot
+    df = df[['Cliente', 'Produto', 'Quantidade', 'AnoMes', 'Grupo']].astype(
+        {**dict.fromkeys(['Cliente', 'Produto', 'Grupo'], 'category'), 'Quantidade': 'float32'}
+    )
+    # Ordenação estável por mês feita uma única vez: os groupby com sort=False já saem em ordem cronológica
+    return df.sort_values('AnoMes', kind='mergesort', ignore_index=True)
+
+def _cliente_produtos(combos):
+    """Produtos ordenados de cada cliente (e de "TODOS") a partir das combinações distintas"""
+    por_cliente = {cliente: sorted(g['Produto'].unique()) for cliente, g in combos.groupby('Cliente', sort=False, observed=True)}
+    opcoes = {"TODOS": sorted(combos['Produto'].unique())}
+    opcoes.update((cliente, por_cliente[cliente]) for cliente in sorted(por_cliente))
+    return opcoes
+
+@st.cache_data(show_spinner=False)
+def build_filter_options(df):
+    """Opções dos filtros em cascata: grupo -> cliente -> produtos, com "TODOS" em cada nível"""
+    # Só as combinações distintas importam: poucas centenas de linhas em vez da base inteira
+    combos = df[['Grupo', 'Cliente', 'Produto']].drop_duplicates()
+    por_grupo = {grupo: _cliente_produtos(g) for grupo, g in combos.groupby('Grupo', sort=False, observed=True)}
+    opcoes = {"TODOS": _cliente_produtos(combos)}
+    opcoes.update((grupo, por_grupo[grupo]) for grupo in sorted(por_grupo))
+    return opcoes
+
+def damped_holt_batch(Y, alpha, beta, phi, horizon):
+    """Holt amortecido com parâmetros fixos aplicado a todas as colunas de Y (meses x séries) de uma vez.
+
+    Meses sem venda (NaN) são pulados, como na série individual de cada produto.
+    Retorna a matriz de previsões (horizon x séries).
+    """
+    Y = np.asarray(Y, dtype=float)
+    level = np.full(Y.shape[1], np.nan)
+    trend = np.zeros(Y.shape[1])
+    for y in Y:
+        obs = ~np.isnan(y)
+        first = obs & np.isnan(level)
+        update = obs & ~first
+        new_level = alpha * y + (1 - alpha) * (level + phi * trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = np.where(first, y, np.where(update, new_level, level))
+        trend = np.where(update, new_trend, trend)
+    damping = np.cumsum(phi ** np.arange(1, horizon + 1))
+    return level + damping[:, None] * trend
+
+@njit(cache=True, fastmath=True)
+def damped_holt_sse(params, y):
+    """Soma dos erros quadráticos um passo à frente do Holt amortecido aditivo"""
+    alpha, beta, phi, level, trend = params[0], params[0] * params[1], params[2], params[3], params[4]
+    sse = 0.0
+    for t in range(y.shape[0]):
+        previsto = level + phi * trend
+        erro = y[t] - previsto
+        sse += erro * erro
+        novo_level = alpha * y[t] + (1.0 - alpha) * previsto
+        trend = beta * (novo_level - level) + (1.0 - beta) * phi * trend
+        level = novo_level
+    return sse
+
+@njit(cache=True)
+def damped_holt_forecast(params, y, horizon):
+    """Percorre a série com os parâmetros ajustados e projeta `horizon` meses à frente"""
+    alpha, beta, phi, level, trend = params[0], params[0] * params[1], params[2], params[3], params[4]
+    for t in range(y.shape[0]):
+        novo_level = alpha * y[t] + (1.0 - alpha) * (level + phi * trend)
+        trend = beta * (novo_level - level) + (1.0 - beta) * phi * trend
+        level = novo_level
+    out = np.empty(horizon)
+    amortecimento = 0.0
+    for h in range(horizon):
+        amortecimento += phi ** (h + 1)
+        out[h] = level + amortecimento * trend
+    return out
+
+@njit(cache=True)
+def damped_holt_start(y):
+    """Busca em grade de (alpha, beta/alpha) para o ponto de partida do otimizador, como o brute do statsmodels"""
+    params = np.array([0.5, 0.1, 0.99, y[0], y[1] - y[0]])
+    melhor = params.copy()
+    melhor_sse = np.inf
+    grade = np.linspace(0.005, 0.995, 30)
+    for alpha in grade:
+        for beta in grade:
+            params[0] = alpha
+            params[1] = beta
+            sse = damped_holt_sse(params, y)
+            if sse < melhor_sse:
+                melhor_sse = sse
+                melhor[:] = params
+    return melhor
+
+@njit(cache=True)
+def damped_holt_sse_bounded(x, y):
+    """SSE com (alpha, beta/alpha, phi) projetados nos limites: o Nelder-Mead não conhece restrições"""
+    params = x.copy()
+    for i in range(3):
+        params[i] = min(max(params[i], HOLT_LOWER[i]), HOLT_UPPER[i])
+    return damped_holt_sse(params, y)
+
+@njit(cache=True)
+def nelder_mead(x0, y, max_iter):
+    """Minimiza damped_holt_sse_bounded a partir de x0; devolve (parâmetros projetados, SSE)"""
+    n = x0.shape[0]
+    simplex = np.empty((n + 1, n))
+    f = np.empty(n + 1)
+    simplex[0] = x0
+    for i in range(n):
+        # Passo inicial para dentro dos limites nos parâmetros restritos
+        passo = 0.05 if i < 3 else 0.1
+        simplex[i + 1] = x0
+        if i < 3 and x0[i] + passo > HOLT_UPPER[i]:
+            simplex[i + 1, i] -= passo
+        else:
+            simplex[i + 1, i] += passo
+    for i in range(n + 1):
+        f[i] = damped_holt_sse_bounded(simplex[i], y)
+
+    for _ in range(max_iter):
+        ordem = np.argsort(f)
+        simplex = simplex[ordem]
+        f = f[ordem]
+        if f[n] - f[0] <= 1e-12 * (1.0 + abs(f[0])):
+            break
+        centro = simplex[:n].sum(axis=0) / n
+        refletido = 2.0 * centro - simplex[n]
+        f_refletido = damped_holt_sse_bounded(refletido, y)
+        if f_refletido < f[0]:
+            expandido = 3.0 * centro - 2.0 * simplex[n]
+            f_expandido = damped_holt_sse_bounded(expandido, y)
+            if f_expandido < f_refletido:
+                simplex[n] = expandido
+                f[n] = f_expandido
+            else:
+                simplex[n] = refletido
+                f[n] = f_refletido
+        elif f_refletido < f[n - 1]:
+            simplex[n] = refletido
+            f[n] = f_refletido
+        else:
+            pior = refletido if f_refletido < f[n] else simplex[n]
+            contraido = 0.5 * (centro + pior)
+            f_contraido = damped_holt_sse_bounded(contraido, y)
+            if f_contraido < min(f_refletido, f[n]):
+                simplex[n] = contraido
+                f[n] = f_contraido
+            else:
+                for i in range(1, n + 1):
+                    simplex[i] = 0.5 * (simplex[0] + simplex[i])
+                    f[i] = damped_holt_sse_bounded(simplex[i], y)
+
+    melhor = np.argmin(f)
+    params = simplex[melhor].copy()
+    for i in range(3):
+        params[i] = min(max(params[i], HOLT_LOWER[i]), HOLT_UPPER[i])
+    return params, f[melhor]
+
+@njit(cache=True)
+def fit_damped_holt(y):
+    """Estima os parâmetros do Holt amortecido minimizando o SSE (mesma parametrização do statsmodels)"""
+    # Ajuste na série normalizada: nível/tendência iniciais ficam na mesma escala dos alphas
+    escala = np.abs(y).max()
+    if escala == 0.0:
+        escala = 1.0
+    y = y / escala
+    # Pontos de partida: o melhor da grade e os cantos alpha≈0 (tendência determinística amortecida) em
+    # alguns phi, onde o SSE costuma ter mínimos que a grade com nível/tendência iniciais fixos não enxerga
+    params, sse = nelder_mead(damped_holt_start(y), y, HOLT_MAX_ITER)
+    for phi in (0.8, 0.9, 0.995):
+        inicio = np.array([0.005, 0.005, phi, y[0], y[1] - y[0]])
+        candidato, sse_candidato = nelder_mead(inicio, y, HOLT_MAX_ITER)
+        if sse_candidato < sse:
+            params, sse = candidato, sse_candidato
+    # Reinicia o simplex a partir do melhor ponto enquanto houver melhora (evita simplex degenerado)
+    for _ in range(5):
+        candidato, sse_candidato = nelder_mead(params, y, HOLT_MAX_ITER)
+        if sse_candidato >= sse * (1.0 - 1e-9):
+            break
+        params, sse = candidato, sse_candidato
+    params[3:] *= escala
+    return params
+
+@njit(cache=True)
+def forecast_series(valores, meses):
+    """Previsão bruta (antes do fator de redução) de uma série mensal já sem meses vazios;
+    meses são os ordinais ano * 12 + mês de cada valor"""
+    # Caminhos rápidos para a cauda longa de produtos: evitam o ajuste quando o resultado é trivial.
+    # "Sem venda recente" conta meses-calendário: os meses vazios já foram retirados da série
+    if (valores > 0).sum() < MIN_ACTIVE_MONTHS or valores[meses > meses[-1] - RECENT_MONTHS].sum() <= 0:
+        return np.zeros(FORECAST_MONTHS)
+    media = valores.mean()
+    if valores.std() < STABLE_CV * media:
+        return np.full(FORECAST_MONTHS, media)
+    # Histórico curto demais para estimar nível, tendência e amortecimento: projeções fechadas
+    if valores.shape[0] <= FLAT_MAX_MONTHS:
+        return np.full(FORECAST_MONTHS, valores[-1])
+    if valores.shape[0] <= SES_MAX_MONTHS:
+        nivel = valores[0]
+        for t in range(1, valores.shape[0]):
+            nivel = SES_ALPHA * valores[t] + (1.0 - SES_ALPHA) * nivel
+        return np.full(FORECAST_MONTHS, nivel)
+
+    params = fit_damped_holt(valores)
+    return damped_holt_forecast(params, valores, FORECAST_MONTHS)
+
+@njit(cache=True, parallel=True)
+def forecast_matrix(Y, meses, ultimo_mes):
+    """Previsões de todos os produtos (linhas de Y, NaN nos meses sem venda) nos FORECAST_MONTHS meses
+    após ultimo_mes; meses são ordinais ano * 12 + mês das colunas. Zeros onde não houver previsão."""
+    out = np.zeros((Y.shape[0], FORECAST_MONTHS), dtype=np.int32)
+    for p in prange(Y.shape[0]):
+        linha = Y[p]
+        observado = ~np.isnan(linha)
+        if observado.sum() < 2:
+            continue
+        # Mesma série de make_forecast_from_series: meses com venda dentro da janela de MAX_HISTORY_MONTHS
+        datas = meses[observado]
+        ultimo = datas[-1]
+        # A previsão do produto começa no mês seguinte à sua última venda; desloca para as datas pedidas
+        # (atraso negativo: o produto tem vendas depois de ultimo_mes). Sem sobreposição, nem ajusta
+        atraso = ultimo_mes - ultimo
+        if atraso >= FORECAST_MONTHS or atraso <= -FORECAST_MONTHS:
+            continue
+        # Sem venda nos RECENT_MONTHS meses-calendário até ultimo_mes: previsão zero, sem ajuste
+        recentes = (datas > ultimo_mes - RECENT_MONTHS) & (datas <= ultimo_mes)
+        if linha[observado][recentes].sum() <= 0:
+            continue
+        janela = datas > ultimo - MAX_HISTORY_MONTHS
+        previsao = np.rint(forecast_series(linha[observado][janela], datas[janela]) * REDUCTION_FACTOR)
+        for h in range(max(0, -atraso), min(FORECAST_MONTHS, FORECAST_MONTHS - atraso)):
+            out[p, h] = np.int32(previsao[atraso + h])
+    return out
+
+@st.cache_resource
+def forecast_lock():
+    """Uma chamada ao kernel paralelo por vez no processo inteiro.
+
+    Sessões diferentes rodam em threads diferentes (a camada workqueue do Numba aborta com lançamentos
+    concorrentes, e cada chamada já usa todos os núcleos). O Streamlit reexecuta o script a cada rerun,
+    então o lock vem do cache_resource e não de uma variável do módulo.
+    """
+    return threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def start_kernel_warmup():
+    """Compila os kernels do Numba numa thread em segundo plano, uma vez por processo.
+
+    Sem cache em disco (container novo) a compilação leva ~17 s; iniciada no primeiro acesso, corre
+    enquanto a tela de login é exibida e grava o cache que os reruns seguintes apenas carregam.
+    """
+    if not HAS_NUMBA:
+        return None
+
+    # O lock é obtido aqui: a thread não tem contexto do Streamlit para consultar o cache_resource
+    lock = forecast_lock()
+
+    def compilar():
+        # Mesmas assinaturas das chamadas reais: série float64 e pivot float64 com meses int64
+        valores = np.arange(1.0, 13.0)
+        meses = np.arange(12, dtype=np.int64)
+        with lock:
+            forecast_series(valores, meses)
+            forecast_matrix(valores[None, :], meses, 11)
+
+    thread = threading.Thread(target=compilar, name='numba-warmup', daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_data(show_spinner=False, max_entries=5000)
+def forecast_values(valores, meses):
+    """Previsão bruta (antes do fator de redução) de uma série mensal; cacheada pelo conteúdo da série"""
+    if HOLT_FIXED_PARAMS is not None:
+        return damped_holt_batch(valores[:, None], *HOLT_FIXED_PARAMS, FORECAST_MONTHS)[:, 0]
+    return forecast_series(valores, meses)
+
+def forecast_quantities(valores, meses):
+    """Previsão final de uma série mensal: valores brutos com o fator de redução, arredondados"""
+    return np.rint(forecast_values(valores, meses) * REDUCTION_FACTOR).astype(np.int32)
 
 def make_forecast_from_series(serie):
-    m = ExponentialSmoothing(serie, trend='add', damped_trend=True, seasonal=None, initialization_method='estimated').fit()
+    # Só os últimos MAX_HISTORY_MONTHS meses entram no ajuste: custo constante por série
+    serie = serie[serie.index > serie.index[-1] - pd.DateOffset(months=MAX_HISTORY_MONTHS)]
+    # Só a distância entre os meses importa (meses vazios contam como calendário): contados a partir do
+    # último mês, a chave de cache não depende das datas absolutas
+    meses = serie.index.year * 12 + serie.index.month
+    meses = (meses - meses[-1]).to_numpy(dtype=np.int64)
     idx = pd.date_range(start=serie.index[-1] + pd.offsets.MonthBegin(), periods=FORECAST_MONTHS, freq='MS')
-    fc = (m.forecast(FORECAST_MONTHS) * REDUCTION_FACTOR).round().astype(int)
-    fc.index = idx
-    df = fc.reset_index()
-    df.columns = ['AnoMes', 'Quantidade']
-    df['Previsao'] = 'PREVISÃO'
-    return df
+    return pd.DataFrame({
+        'AnoMes': idx,
+        'Quantidade': forecast_quantities(serie.to_numpy(dtype=float), meses),
+        'Previsao': 'PREVISÃO'
+    })
 
+@st.cache_data(show_spinner=False, max_entries=64)
 def create_plot(df, title):
+    """Gráfico de linha histórico + previsão; cacheado pelo conteúdo de df e pelo título"""
     try:
         fig = px.line(
             df,
@@ -191,14 +610,12 @@ def create_plot(df, title):
             color='Previsao',
             title=title.upper(),
             markers=True,
+            render_mode='webgl',  # traços Scattergl: renderização na GPU em vez de SVG
+            # Cores: histórico (preto), previsão (vermelho), definidas já na criação dos traços
+            color_discrete_map={'HISTÓRICO': 'black', 'PREVISÃO': 'red'},
             labels={'AnoMes': 'MÊS', 'Quantidade': 'QUANTIDADE', 'Previsao': 'TIPO'}
         )
 
-        # Cores: histórico (preto), previsão (vermelho)
-        fig.for_each_trace(
-            lambda t: t.update(line=dict(color='black')) if t.name == 'HISTÓRICO' else t.update(line=dict(color='red'))
-        )
-
         fig.update_layout(
             title_x=0.5,
             hovermode='x unified',
@@ -219,49 +636,45 @@ def create_plot(df, title):
         st.error(f"❌ Erro ao criar gráfico: {str(e)}")
         return None
 
-def create_bar_chart(df, grupo_atual, cliente_atual, produto_atual):
+def create_bar_chart(df_filtered, grupo_atual, cliente_atual, produto_atual):
     """Cria gráfico de barras com as quantidades vendidas em ordem decrescente"""
     try:
-        # Aplicar os mesmos filtros da análise principal
-        dfg = df if grupo_atual == "TODOS" else df[df['Grupo'] == grupo_atual]
-        dfc = dfg if cliente_atual == "TODOS" else dfg[dfg['Cliente'] == cliente_atual]
-        df_filtered = dfc if produto_atual == "TODOS" else dfc[dfc['Produto'] == produto_atual]
-        
+        # df_filtered já chega com os mesmos filtros da análise principal
         if df_filtered.empty:
             return None
         
         # Determinar qual agrupamento usar baseado nos filtros
         if cliente_atual != "TODOS" and produto_atual == "TODOS":
             # Cliente específico - agrupar por produto
-            grouped = df_filtered.groupby('Produto')['Quantidade'].sum().reset_index()
+            grouped = df_filtered.groupby('Produto', sort=False, observed=True)['Quantidade'].sum().reset_index()
             grouped = grouped.sort_values('Quantidade', ascending=True)  # Para ter as maiores no topo
             titulo = f"PRODUTOS MAIS VENDIDOS - {cliente_atual}"
             x_label = "PRODUTO"
             
         elif grupo_atual != "TODOS" and cliente_atual == "TODOS" and produto_atual == "TODOS":
             # Linha específica - agrupar por cliente
-            grouped = df_filtered.groupby('Cliente')['Quantidade'].sum().reset_index()
+            grouped = df_filtered.groupby('Cliente', sort=False, observed=True)['Quantidade'].sum().reset_index()
             grouped = grouped.sort_values('Quantidade', ascending=True)
             titulo = f"CLIENTES QUE MAIS COMPRARAM - LINHA {grupo_atual}"
             x_label = "CLIENTE"
             
         elif produto_atual != "TODOS" and cliente_atual == "TODOS":
             # Produto específico - agrupar por cliente
-            grouped = df_filtered.groupby('Cliente')['Quantidade'].sum().reset_index()
+            grouped = df_filtered.groupby('Cliente', sort=False, observed=True)['Quantidade'].sum().reset_index()
             grouped = grouped.sort_values('Quantidade', ascending=True)
             titulo = f"CLIENTES QUE MAIS COMPRARAM - {produto_atual}"
             x_label = "CLIENTE"
             
         elif cliente_atual == "TODOS" and produto_atual == "TODOS" and grupo_atual == "TODOS":
             # Todos - agrupar por linha (grupo)
-            grouped = df_filtered.groupby('Grupo')['Quantidade'].sum().reset_index()
+            grouped = df_filtered.groupby('Grupo', sort=False, observed=True)['Quantidade'].sum().reset_index()
             grouped = grouped.sort_values('Quantidade', ascending=True)
             titulo = "LINHAS QUE MAIS VENDEM"
             x_label = "LINHA"
             
         else:
             # Caso específico de cliente + produto - agrupar por mês
-            grouped = df_filtered.groupby('AnoMes')['Quantidade'].sum().reset_index()
+            grouped = df_filtered.groupby('AnoMes', sort=False, observed=True)['Quantidade'].sum().reset_index()
             grouped['Mes_Ano'] = grouped['AnoMes'].dt.strftime('%m/%Y')
             grouped = grouped.sort_values('Quantidade', ascending=True)
             titulo = f"VENDAS MENSAIS - {cliente_atual} - {produto_atual}"
@@ -270,7 +683,7 @@ def create_bar_chart(df, grupo_atual, cliente_atual, produto_atual):
         
         # Se não é o caso específico de mês, usar a primeira coluna como label
         if 'Label' not in grouped.columns:
-            grouped['Label'] = grouped.iloc[:, 0]
+            grouped['Label'] = grouped.iloc[:, 0].astype(str)
         
         # Limitar a 20 itens para melhor visualização
         if len(grouped) > 20:
@@ -315,103 +728,129 @@ def create_bar_chart(df, grupo_atual, cliente_atual, produto_atual):
         st.error(f"❌ Erro ao criar gráfico de barras: {str(e)}")
         return None
 
-def create_export_table(df, selected_date):
-    """Cria tabela consolidada por produto para exportação - MESMA LÓGICA DO GRÁFICO"""
-    export_data = []
-    produtos = df['Produto'].unique()
-    
-    for produto in produtos:
-        df_produto = df[df['Produto'] == produto]
-        
-        # MESMA LÓGICA DO GRÁFICO PRINCIPAL
-        grouped = df_produto.groupby('AnoMes', as_index=False)['Quantidade'].sum()
-        
-        if len(grouped) < 2:
-            continue
-        
-        # Criar série exatamente como no gráfico
-        serie = grouped.set_index('AnoMes')['Quantidade'].sort_index()
-        
-        try:
-            # MESMA FUNÇÃO DE PREVISÃO DO GRÁFICO
-            fc = make_forecast_from_series(serie)
-            
-            # Procurar pela data selecionada
-            previsao_mes = fc[fc['AnoMes'] == selected_date]
-            
-            if not previsao_mes.empty:
-                quantidade_prevista = int(previsao_mes['Quantidade'].iloc[0])
-                if quantidade_prevista > 0:
-                    export_data.append({
-                        'Produto': produto,
-                        'Data': selected_date.strftime('%m/%Y'),
-                        'Quantidade_Prevista': quantidade_prevista
-                    })
-        except:
-            continue
-    
-    return pd.DataFrame(export_data)
+def monthly_pivot(df):
+    """Soma mensal por produto em um único groupby: produtos x meses, NaN nos meses sem venda"""
+    return df.groupby(['Produto', 'AnoMes'], observed=True)['Quantidade'].sum().unstack('AnoMes')
+
+@st.cache_resource
+def forecast_row_cache():
+    """Previsões já calculadas por série, compartilhadas entre sessões e filtros do mesmo processo.
+
+    Devolve o LRU (chave da série -> linha de previsões) e o lock que o protege entre sessões.
+    """
+    return OrderedDict(), threading.Lock()
+
+def series_key(linha, meses, ancora):
+    """Chave de uma linha do pivot: quantidades observadas e seus meses relativos à âncora"""
+    observado = ~np.isnan(linha)
+    return hashlib.blake2b(linha[observado].tobytes() + (meses[observado] - ancora).tobytes(), digest_size=16).digest()
+
+def forecast_pivot(pivot, ancora):
+    """forecast_matrix sobre o pivot produtos x meses, rodando o kernel só para as séries fora do cache"""
+    meses = (pivot.columns.year * 12 + pivot.columns.month).to_numpy(dtype=np.int64)
+    # Somas mensais em float32 promovidas a float64 só aqui: o ajuste do Holt precisa da precisão dupla
+    Y = pivot.to_numpy(dtype=float)
+    cache, cache_lock = forecast_row_cache()
+    chaves = [series_key(linha, meses, ancora) for linha in Y]
+    # O resultado é montado fora do cache: outra sessão pode expulsar chaves a qualquer momento
+    quantidades = np.empty((len(chaves), FORECAST_MONTHS), dtype=np.int32)
+    faltando = []
+    with cache_lock:
+        for i, chave in enumerate(chaves):
+            linha = cache.get(chave)
+            if linha is None:
+                faltando.append(i)
+            else:
+                cache.move_to_end(chave)
+                quantidades[i] = linha
+    if faltando:
+        with forecast_lock():
+            quantidades[faltando] = forecast_matrix(Y[faltando], meses, ancora)
+        with cache_lock:
+            for i in faltando:
+                cache[chaves[i]] = quantidades[i].copy()
+            while len(cache) > FORECAST_CACHE_MAX:
+                cache.popitem(last=False)
+    return quantidades
+
+def create_batch_forecasts_table(df, forecast_dates):
+    """Versão vetorizada de create_all_forecasts_table para HOLT_FIXED_PARAMS: uma matriz meses x produtos"""
+    pivot = monthly_pivot(df).T
+    observado = pivot.notna().to_numpy()
+    ultimo = pivot.index[observado.shape[0] - 1 - np.argmax(observado[::-1], axis=0)]
+    # Mesma janela de MAX_HISTORY_MONTHS de make_forecast_from_series, contada a partir do último mês de cada produto
+    janela = pivot.index.to_numpy()[:, None] > (ultimo - pd.DateOffset(months=MAX_HISTORY_MONTHS)).to_numpy()[None, :]
+    Y = np.where(janela, pivot.to_numpy(), np.nan)
+    fc = damped_holt_batch(Y, *HOLT_FIXED_PARAMS, FORECAST_MONTHS)
+    quantidades = np.rint(fc * REDUCTION_FACTOR).astype(np.int32)
+
+    # Cada produto prevê a partir do seu último mês com venda; alinhar com as datas globais de previsão
+    max_date = forecast_dates[0] - pd.DateOffset(months=1)
+    atraso = (max_date.year - ultimo.year) * 12 + (max_date.month - ultimo.month)
+    passos = np.arange(FORECAST_MONTHS)[:, None] + atraso.to_numpy()[None, :]
+    validos = passos < FORECAST_MONTHS
+    valores = np.take_along_axis(quantidades, np.minimum(passos, FORECAST_MONTHS - 1), axis=0)
+    manter = validos & (valores > 0) & (observado.sum(axis=0) >= 2)[None, :]
+
+    p_idx, d_idx = np.nonzero(manter.T)
+    datas = pd.DatetimeIndex(forecast_dates)[d_idx]
+    return pd.DataFrame({
+        'Produto': pd.Categorical(pivot.columns[p_idx]),
+        'Data': datas.strftime('%m/%Y'),
+        'AnoMes': datas,
+        'Quantidade_Prevista': valores.T[manter.T].astype(np.int32)
+    })
 
+@st.cache_data(show_spinner=False, ttl=3600)
 def create_all_forecasts_table(df):
     """Cria tabela com TODAS as previsões para todos os produtos"""
-    all_forecasts = []
-    produtos = df['Produto'].unique()
-    
     # Calcular datas de previsão
     max_date = df['AnoMes'].max()
     forecast_dates = []
     for i in range(1, FORECAST_MONTHS + 1):
         future_date = max_date + pd.DateOffset(months=i)
         forecast_dates.append(future_date)
+
+    # Produtos sem venda nos últimos FORECAST_MONTHS meses não alcançam as datas de previsão;
+    # para os demais, a janela de MAX_HISTORY_MONTHS começa depois deste corte
+    corte = max_date - pd.DateOffset(months=MAX_HISTORY_MONTHS + FORECAST_MONTHS - 1)
+    df = df[df['AnoMes'] > corte]
+
+    if HOLT_FIXED_PARAMS is not None:
+        return create_batch_forecasts_table(df, forecast_dates)
     
-    for produto in produtos:
-        df_produto = df[df['Produto'] == produto]
-        grouped = df_produto.groupby('AnoMes', as_index=False)['Quantidade'].sum()
-        
-        if len(grouped) < 2:
-            continue
-        
-        serie = grouped.set_index('AnoMes')['Quantidade'].sort_index()
-        
-        try:
-            fc = make_forecast_from_series(serie)
-            
-            # Para cada mês de previsão
-            for forecast_date in forecast_dates:
-                previsao_mes = fc[fc['AnoMes'] == forecast_date]
-                
-                if not previsao_mes.empty:
-                    quantidade_prevista = int(previsao_mes['Quantidade'].iloc[0])
-                    if quantidade_prevista > 0:
-                        all_forecasts.append({
-                            'Produto': produto,
-                            'Data': forecast_date.strftime('%m/%Y'),
-                            'AnoMes': forecast_date,
-                            'Quantidade_Prevista': quantidade_prevista
-                        })
-        except:
-            continue
-    
-    return pd.DataFrame(all_forecasts)
+    # Um único groupby monta o pivot produtos x meses; um único kernel ajusta e prevê todos os produtos
+    pivot = monthly_pivot(df)
+    quantidades = forecast_pivot(pivot, max_date.year * 12 + max_date.month)
+
+    # Tabela montada uma única vez: produto x mês achatado, mantendo só as previsões positivas
+    forecast_dates = pd.DatetimeIndex(forecast_dates)
+    manter = quantidades.ravel() > 0
+    return pd.DataFrame({
+        'Produto': pd.Categorical(np.repeat(pivot.index.to_numpy(), FORECAST_MONTHS)[manter]),
+        'Data': np.tile(forecast_dates.strftime('%m/%Y').to_numpy(), len(pivot))[manter],
+        'AnoMes': np.tile(forecast_dates, len(pivot))[manter],
+        'Quantidade_Prevista': quantidades.ravel()[manter]
+    })
 
 def to_excel_single(df):
     """Converte DataFrame para Excel em memória - versão simples"""
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Previsoes_Completas', index=False)
+        # Dados a partir da linha 2; o cabeçalho é escrito abaixo uma única vez, já formatado
+        df.to_excel(writer, sheet_name='Previsoes_Completas', index=False, header=False, startrow=1)
         
-        # Formatação básica
+        # Formatação básica (formatos criados uma única vez)
         workbook = writer.book
         worksheet = writer.sheets['Previsoes_Completas']
+        number_format = workbook.add_format({'num_format': '#,##0'})
+        header_format = workbook.add_format({'bold': True})
         
         # Formato para números
-        number_format = workbook.add_format({'num_format': '#,##0'})
         worksheet.set_column('C:C', 15, number_format)
         
-        # Cabeçalho em negrito
-        header_format = workbook.add_format({'bold': True})
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
+        # Cabeçalho em negrito, gravado numa única chamada (o pandas não escreve o seu)
+        worksheet.write_row(0, 0, list(df.columns), header_format)
             
         # Ajustar largura das colunas
         worksheet.set_column('A:A', 30)  # Produto
@@ -422,28 +861,40 @@ def to_excel_single(df):
 
 
 
-def show_export_section(df, grupo_atual, cliente_atual, produto_atual):
+def forecast_to_export_table(fc, produto):
+    """Converte a previsão já calculada de um único produto no formato da tabela de exportação"""
+    fc = fc[fc['Quantidade'] > 0]
+    return pd.DataFrame({
+        'Produto': produto,
+        'Data': fc['AnoMes'].dt.strftime('%m/%Y'),
+        'AnoMes': fc['AnoMes'],
+        'Quantidade_Prevista': fc['Quantidade'].astype(np.int32)
+    }).reset_index(drop=True)
+
+@st.fragment
+def show_export_section(df_filtered, grupo_atual, cliente_atual, produto_atual, fc=None):
     """Seção para exportação de previsões - OBEDECE OS MESMOS FILTROS DA ANÁLISE GRÁFICA"""
+    # Fragmento: interações aqui (ex.: o botão de download) reexecutam só esta seção, não o gráfico acima
     st.markdown("---")
     st.markdown("## 📋 EXPORTAÇÃO DE PREVISÕES POR PRODUTO")
     
     # Mostrar filtros aplicados
     st.info(f"📊 **Filtros Aplicados:** Linha: {grupo_atual} | Cliente: {cliente_atual} | Produto: {produto_atual}")
     
-    # Aplicar os mesmos filtros da análise gráfica
-    dfg = df if grupo_atual == "TODOS" else df[df['Grupo'] == grupo_atual]
-    dfc = dfg if cliente_atual == "TODOS" else dfg[dfg['Cliente'] == cliente_atual]
-    df_filtered = dfc if produto_atual == "TODOS" else dfc[dfc['Produto'] == produto_atual]
-    
+    # df_filtered é o mesmo recorte da análise gráfica: nenhuma cópia filtrada extra da base
     if not df_filtered.empty:
         # Gerar tabela completa com todas as previsões
-        all_forecasts = create_all_forecasts_table(df_filtered)
+        if produto_atual != "TODOS" and fc is not None:
+            # Produto único: reaproveitar a previsão já calculada para o gráfico
+            all_forecasts = forecast_to_export_table(fc, produto_atual)
+        else:
+            all_forecasts = create_all_forecasts_table(df_filtered)
         
         if not all_forecasts.empty:
             # Mostrar resumo
-            total_produtos = len(all_forecasts['Produto'].unique())
+            total_produtos = all_forecasts['Produto'].nunique()
             total_previsoes = len(all_forecasts)
-            meses_previstos = len(all_forecasts['Data'].unique())
+            meses_previstos = all_forecasts['AnoMes'].nunique()
             
             col1, col2, col3 = st.columns(3)
             col1.metric("🎯 PRODUTOS", total_produtos)
@@ -462,8 +913,12 @@ def show_export_section(df, grupo_atual, cliente_atual, produto_atual):
             else:
                 filename_suffix = "todos"
             
+            # Ordenado uma única vez (mês, depois maior quantidade) para o Excel e para o preview
+            export_df = all_forecasts.sort_values(['AnoMes', 'Quantidade_Prevista'], ascending=[True, False], kind='stable')
+            export_df = export_df[['Produto', 'Data', 'Quantidade_Prevista']]
+
             # Botão de download
-            excel_complete = to_excel_single(all_forecasts[['Produto', 'Data', 'Quantidade_Prevista']].sort_values(['Data', 'Quantidade_Prevista'], ascending=[True, False]))
+            excel_complete = to_excel_single(export_df)
             filename_complete = f"previsoes_{filename_suffix}_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.xlsx"
             
             st.download_button(
@@ -478,7 +933,7 @@ def show_export_section(df, grupo_atual, cliente_atual, produto_atual):
             # Preview dos dados completos
             with st.expander("👀 PREVIEW DOS DADOS PARA EXPORTAÇÃO"):
                 st.dataframe(
-                    all_forecasts[['Produto', 'Data', 'Quantidade_Prevista']].sort_values(['Data', 'Quantidade_Prevista'], ascending=[True, False]),
+                    export_df,
                     use_container_width=True
                 )
             
@@ -489,8 +944,6 @@ def show_export_section(df, grupo_atual, cliente_atual, produto_atual):
 
 def show_dashboard():
     """Exibe o dashboard principal após autenticação"""
-    st.set_page_config(page_title="PAINEL DE VENDAS", layout="wide")
-    
     # Header com botão de logout
     col1, col2 = st.columns([4, 1])
     with col1:
@@ -500,14 +953,11 @@ def show_dashboard():
         if st.button("🚪 SAIR", type="secondary", key="logout_btn"):
             logout()
 
-    @st.cache_data
-    def get_data():
-        return load_data()
-    
-    df = get_data()
+    df_raw, df = get_data()
 
-    if not validate_data(df, ['Cliente', 'Produto', 'Quantidade', 'AnoMes', 'Grupo']):
+    if not validate_data(df_raw, ['Cliente', 'Produto', 'Quantidade', 'AnoMes', 'Grupo']):
         st.stop()
+    # Daqui em diante o painel usa só a base mensal pré-agregada
 
     # === SEÇÃO PRINCIPAL DE GRÁFICOS ===
     st.markdown("## 📈 ANÁLISE GRÁFICA")
@@ -520,17 +970,21 @@ def show_dashboard():
     if 'produto_selecionado' not in st.session_state:
         st.session_state.produto_selecionado = "TODOS"
     
-    grupo = st.selectbox("SELECIONE A LINHA", ["TODOS"] + sorted(df['Grupo'].unique()), 
-                        index=0 if st.session_state.grupo_selecionado == "TODOS" else 
-                        (["TODOS"] + sorted(df['Grupo'].unique())).index(st.session_state.grupo_selecionado) 
-                        if st.session_state.grupo_selecionado in df['Grupo'].unique() else 0,
+    # Opções pré-calculadas por versão dos dados: cada selectbox é só uma consulta ao dicionário
+    opcoes = build_filter_options(df)
+    grupos_disponiveis = list(opcoes)
+    if st.session_state.grupo_selecionado not in grupos_disponiveis:
+        st.session_state.grupo_selecionado = "TODOS"
+
+    grupo = st.selectbox("SELECIONE A LINHA", grupos_disponiveis,
+                        index=grupos_disponiveis.index(st.session_state.grupo_selecionado),
                         key="grupo_select")
     st.session_state.grupo_selecionado = grupo
     
     dfg = df if grupo == "TODOS" else df[df['Grupo'] == grupo]
 
     # Resetar cliente e produto se o grupo mudou
-    clientes_disponiveis = ["TODOS"] + sorted(dfg['Cliente'].unique())
+    clientes_disponiveis = list(opcoes[grupo])
     if st.session_state.cliente_selecionado not in clientes_disponiveis:
         st.session_state.cliente_selecionado = "TODOS"
     
@@ -542,7 +996,7 @@ def show_dashboard():
     dfc = dfg if cliente == "TODOS" else dfg[dfg['Cliente'] == cliente]
 
     # Resetar produto se o cliente mudou
-    produtos_disponiveis = ["TODOS"] + sorted(dfc['Produto'].unique())
+    produtos_disponiveis = ["TODOS"] + opcoes[grupo][cliente]
     if st.session_state.produto_selecionado not in produtos_disponiveis:
         st.session_state.produto_selecionado = "TODOS"
 
@@ -556,13 +1010,21 @@ def show_dashboard():
         st.warning("⚠️ Nenhum dado com os filtros aplicados.")
         return
 
-    grouped = dff.groupby('AnoMes', as_index=False)['Quantidade'].sum()
-    grouped['Previsao'] = 'HISTÓRICO'
-    serie = grouped.set_index('AnoMes')['Quantidade'].sort_index()
+    # A base vem ordenada por AnoMes: o groupby sem ordenação já devolve os meses em ordem cronológica
+    grouped = dff.groupby('AnoMes', as_index=False, sort=False, observed=True)['Quantidade'].sum()
+    serie = grouped.set_index('AnoMes')['Quantidade']
 
     try:
         fc = make_forecast_from_series(serie)
-        resultado = pd.concat([grouped, fc], ignore_index=True)
+        # Histórico + previsão montados direto dos arrays (evita o alinhamento do pd.concat)
+        resultado = pd.DataFrame({
+            col: np.concatenate([grouped[col].to_numpy(), fc[col].to_numpy()])
+            for col in ['AnoMes', 'Quantidade']
+        })
+        # Tipo da linha como categoria: histórico = código 0, previsão = código 1
+        resultado['Previsao'] = pd.Categorical.from_codes(
+            np.repeat(np.array([0, 1], dtype=np.int8), [len(grouped), len(fc)]), dtype=PREVISAO_DTYPE
+        )
     except Exception as e:
         st.error(f"❌ Erro na previsão: {e}")
         return
@@ -587,7 +1049,7 @@ def show_dashboard():
     st.markdown("---")
     st.markdown("## 📊 ANÁLISE DE VENDAS POR RANKING")
     
-    bar_fig = create_bar_chart(df, grupo, cliente, produto)
+    bar_fig = create_bar_chart(dff, grupo, cliente, produto)
     if bar_fig:
         st.plotly_chart(bar_fig, use_container_width=True)
     else:
@@ -596,8 +1058,10 @@ def show_dashboard():
     st.divider()
 
     with st.expander("📈 ESTATÍSTICAS DETALHADAS", expanded=True):
-        historico = resultado[resultado['Previsao'] == 'HISTÓRICO']['Quantidade']
-        previsao = resultado[resultado['Previsao'] == 'PREVISÃO']['Quantidade']
+        # Uma única máscara pelos códigos da categoria, reaproveitada nos dois recortes
+        eh_historico = resultado['Previsao'].cat.codes.to_numpy() == 0
+        historico = resultado['Quantidade'][eh_historico]
+        previsao = resultado['Quantidade'][~eh_historico]
 
         st.subheader("📊 HISTÓRICO")
         col1, col2, col3, col4 = st.columns(4)
@@ -619,10 +1083,18 @@ def show_dashboard():
         st.caption("⚠️ Valores previstos foram suavizados com um fator de redução para representar cenários mais conservadores.")
 
     # === NOVA SEÇÃO DE EXPORTAÇÃO ===
-    show_export_section(df, grupo, cliente, produto)
+    show_export_section(dff, grupo, cliente, produto, fc)
 
 def main():
     """Função principal que controla o fluxo da aplicação"""
+    # Configuração da página antes de qualquer outro comando do Streamlit, escolhida pelo estado do login
+    if st.session_state.get('authenticated', False):
+        st.set_page_config(page_title="PAINEL DE VENDAS", layout="wide")
+    else:
+        st.set_page_config(page_title="LOGIN - PAINEL DE VENDAS", layout="centered")
+    st.markdown(HIDE_FOOTER_CSS, unsafe_allow_html=True)
+    start_kernel_warmup()
+
     # Verifica autenticação
     if not check_authentication():
         return
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import streamlit_app as app
+
+
+def make_pivot(n_produtos=12, n_meses=24, seed=0):
+    rng = np.random.default_rng(seed)
+    valores = rng.gamma(2.0, 50.0, size=(n_produtos, n_meses))
+    valores[rng.random(valores.shape) < 0.15] = np.nan
+    meses = pd.date_range('2024-01-01', periods=n_meses, freq='MS')
+    return pd.DataFrame(valores, index=[f'P{i:02d}' for i in range(n_produtos)], columns=meses)
+
+
+def esperado(pivot, ancora):
+    meses = (pivot.columns.year * 12 + pivot.columns.month).to_numpy(dtype=np.int64)
+    return app.forecast_matrix(pivot.to_numpy(dtype=float), meses, ancora)
+
+
+def test_forecast_pivot_evicts_with_small_cap(monkeypatch):
+    monkeypatch.setattr(app, 'FORECAST_CACHE_MAX', 8)
+    app.forecast_row_cache.clear()
+    pivot = make_pivot()
+    ancora = 2025 * 12 + 12
+
+    np.testing.assert_array_equal(app.forecast_pivot(pivot, ancora), esperado(pivot, ancora))
+
+    # Cache cheio e uma linha alterada: acertos, faltas e expulsões na mesma chamada
+    pivot.iloc[3] = pivot.iloc[3] * 2
+    np.testing.assert_array_equal(app.forecast_pivot(pivot, ancora), esperado(pivot, ancora))
+    cache, _ = app.forecast_row_cache()
+    assert len(cache) == 8
+
+
+def test_forecast_pivot_result_is_not_shared_with_cache():
+    app.forecast_row_cache.clear()
+    pivot = make_pivot(seed=1)
+    ancora = 2025 * 12 + 12
+    primeira = app.forecast_pivot(pivot, ancora)
+    primeira[:] = -1
+    np.testing.assert_array_equal(app.forecast_pivot(pivot, ancora), esperado(pivot, ancora))
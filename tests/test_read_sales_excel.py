@@ -0,0 +1,54 @@
+import re
+import zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import streamlit_app as app
+
+
+def write_workbook(path, dimension):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Base vendas'
+    ws.append(['Emissão', 'Cliente', 'Produto', 'Quantidade', 'Grupo'])
+    ws.append([pd.Timestamp('2024-02-03'), ' loja a', 'p1', 3, 'g1'])
+    ws.append([pd.Timestamp('2024-03-15'), 'Loja B', 'p2', 4.5, 'g2'])
+    # Linhas curtas no fim: Grupo vazio, e Cliente vazio (descartada)
+    ws.append([pd.Timestamp('2024-04-03'), 'loja c', 'p3', 5])
+    ws.append([pd.Timestamp('2024-04-20'), None, 'p4', 6])
+    wb.save(path)
+
+    # Regrava a planilha sem o registro <dimension> ou com um registro errado
+    origem = path.with_suffix('.orig.xlsx')
+    path.rename(origem)
+    with zipfile.ZipFile(origem) as zin, zipfile.ZipFile(path, 'w') as zout:
+        for item in zin.infolist():
+            dados = zin.read(item.filename)
+            if item.filename.startswith('xl/worksheets/'):
+                novo = b'' if dimension is None else f'<dimension ref="{dimension}"/>'.encode()
+                dados = re.sub(rb'<dimension[^>]*/>', novo, dados)
+            zout.writestr(item, dados)
+
+
+@pytest.mark.parametrize('dimension', [None, 'A1:B2'])
+def test_read_sales_excel_ignores_dimension_record(tmp_path, dimension):
+    path = tmp_path / 'base.xlsx'
+    write_workbook(path, dimension)
+
+    df = app.read_sales_excel(str(path))
+
+    bruto = pd.read_excel(path, sheet_name='Base vendas')
+    bruto.columns = ['Emissao', 'Cliente', 'Produto', 'Quantidade', 'Grupo']
+    bruto = bruto.dropna(subset=['Cliente', 'Produto', 'Quantidade'])
+    esperado = pd.DataFrame({
+        'Cliente': bruto['Cliente'].str.strip().str.upper(),
+        'Produto': bruto['Produto'].str.strip().str.upper(),
+        'Quantidade': bruto['Quantidade'].astype('float32'),
+        'AnoMes': bruto['Emissao'].dt.to_period('M').dt.to_timestamp().astype('datetime64[ns]'),
+        'Grupo': bruto['Grupo'].str.strip().str.upper().fillna('SEM GRUPO'),
+    }).reset_index(drop=True)
+
+    texto = ['Cliente', 'Produto', 'Grupo']
+    pd.testing.assert_frame_equal(df.astype(dict.fromkeys(texto, object)), esperado.astype(dict.fromkeys(texto, object)))
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import streamlit_app as app
+
+
+def make_serie(n_meses=18):
+    rng = np.random.default_rng(7)
+    datas = pd.date_range('2023-01-01', periods=n_meses, freq='MS')
+    return pd.Series(100.0 + 5.0 * np.arange(n_meses) + rng.normal(0.0, 8.0, n_meses), index=datas)
+
+
+def forecast_at(serie, atraso):
+    """forecast_matrix de um único produto cuja última venda fica atraso meses antes da âncora"""
+    datas = pd.date_range(serie.index[0], periods=len(serie) + atraso, freq='MS')
+    linha = np.full(len(datas), np.nan)
+    linha[:len(serie)] = serie.to_numpy()
+    meses = (datas.year * 12 + datas.month).to_numpy(dtype=np.int64)
+    return app.forecast_matrix(linha[None, :], meses, int(meses[-1]))[0]
+
+
+def test_last_sale_recent_months_before_anchor_is_not_forecast():
+    assert not forecast_at(make_serie(), app.RECENT_MONTHS).any()
+
+
+def test_last_sale_inside_recent_window_is_forecast():
+    assert forecast_at(make_serie(), app.RECENT_MONTHS - 1).any()
+
+
+def test_shifted_forecast_matches_chart_series():
+    serie = make_serie()
+    grafico = app.make_forecast_from_series(serie)['Quantidade'].to_numpy()
+    assert (grafico > 0).all()
+
+    atraso = app.RECENT_MONTHS - 1
+    previsao = forecast_at(serie, atraso)
+    np.testing.assert_array_equal(previsao[:app.FORECAST_MONTHS - atraso], grafico[atraso:])
+    assert not previsao[app.FORECAST_MONTHS - atraso:].any()